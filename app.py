@@ -1,26 +1,84 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import uuid
-from datetime import datetime
+import atexit
+import csv
+import gzip
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
 import requests
-
-# -------------------------------
-# Endpoint to ping and keep app awake; Endpoint =  https://inventory-health-check.streamlit.app/?ping=1 
-# -------------------------------
-
-if st.query_params.get("ping") == "1":
-    st.write("OK")
-    st.stop()
-
+from requests.adapters import HTTPAdapter
 
 # -------------------------------
 # Baserow Configuration
 # -------------------------------
 BASEROW_BASE_URL = st.secrets.get('BASEROW_BASE_URL', 'https://baserowapp.goxmit.com/api')
 BASEROW_TOKEN = st.secrets['BASEROW_TOKEN']
-
-def baserow_api_request(method, endpoint, data=None, params=None):
-    """Universal function to call Baserow API"""
+BASEROW_TIMEOUT_SECONDS = float(st.secrets.get('BASEROW_TIMEOUT_SECONDS', 10))
+BASEROW_POOL_SIZE = int(st.secrets.get('BASEROW_POOL_SIZE', 10))
+BASEROW_LATENCY_WINDOW_SECONDS = float(st.secrets.get('BASEROW_LATENCY_WINDOW_SECONDS', 30))
+
+class BaserowLoad:
+    """Process-wide view of Baserow load: in-flight calls, recent latency and counters"""
+
+    def __init__(self, latency_window_seconds):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.latency_window_seconds = latency_window_seconds
+        self.latencies = deque(maxlen=200)
+        self.counters = Counter()
+
+    @contextmanager
+    def track(self):
+        with self.lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self.lock:
+                self.in_flight -= 1
+                self.latencies.append((finished, finished - started))
+
+    def recent_latency(self):
+        """Mean latency of calls finished within the window; 0 when there are none"""
+        cutoff = time.monotonic() - self.latency_window_seconds
+        with self.lock:
+            recent = [latency for finished, latency in self.latencies if finished >= cutoff]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+@st.cache_resource(show_spinner=False)
+def get_baserow_load():
+    return BaserowLoad(BASEROW_LATENCY_WINDOW_SECONDS)
+
+@st.cache_resource(show_spinner=False)
+def get_baserow_session():
+    """Shared HTTP session so Baserow calls reuse pooled keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BASEROW_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def baserow_api_request(method, endpoint, data=None, params=None, background=False):
+    """
+    Universal function to call Baserow API.
+    Background calls (warmer, sweeper) are left out of the load figures used for admission.
+    """
     url = f"{BASEROW_BASE_URL}/{endpoint}"
     
     headers = {
@@ -33,13 +91,15 @@ def baserow_api_request(method, endpoint, data=None, params=None):
         query_params.update(params)
     
     try:
-        response = requests.request(
-            method,
-            url,
-            headers=headers,
-            params=query_params,
-            json=data
-        )
+        with nullcontext() if background else get_baserow_load().track():
+            response = get_baserow_session().request(
+                method,
+                url,
+                headers=headers,
+                params=query_params,
+                json=data,
+                timeout=BASEROW_TIMEOUT_SECONDS
+            )
         
         response.raise_for_status()
         return response.json()
@@ -50,6 +110,360 @@ def baserow_api_request(method, endpoint, data=None, params=None):
             print(f"Response: {e.response.text}")
         return None
 
+# -------------------------------
+# Connection warmer
+# -------------------------------
+WARMUP_ENABLED = str(st.secrets.get('WARMUP_ENABLED', 'true')).lower() == 'true'
+# Interval + jitter must stay below the keep-alive idle timeout of Baserow's proxy
+# (nginx 75 s, AWS ALB 60 s), or the pooled socket is closed between warm-ups
+WARMUP_INTERVAL_SECONDS = float(st.secrets.get('WARMUP_INTERVAL_SECONDS', 45))
+WARMUP_JITTER_SECONDS = float(st.secrets.get('WARMUP_JITTER_SECONDS', 10))
+WARMUP_TABLE_ID = st.secrets.get('SESSIONS_TABLE_ID')
+
+def warm_baserow_connection():
+    """Cheap one-row read that keeps a pooled TLS connection to Baserow open"""
+    baserow_api_request(
+        "GET",
+        f"database/rows/table/{WARMUP_TABLE_ID}/",
+        params={"size": "1"},
+        background=True
+    )
+
+def _connection_warmer_loop():
+    while True:
+        warm_baserow_connection()
+        jitter = random.uniform(-WARMUP_JITTER_SECONDS, WARMUP_JITTER_SECONDS)
+        time.sleep(max(1.0, WARMUP_INTERVAL_SECONDS + jitter))
+
+@st.cache_resource(show_spinner=False)
+def start_connection_warmer():
+    """Start one background warmer per server process (first request warms immediately)"""
+    thread = threading.Thread(target=_connection_warmer_loop, name="baserow-warmer", daemon=True)
+    thread.start()
+    return thread
+
+if WARMUP_ENABLED and WARMUP_TABLE_ID:
+    start_connection_warmer()
+
+# -------------------------------
+# Admission control
+# -------------------------------
+ADMISSION_MAX_IN_FLIGHT = int(st.secrets.get('ADMISSION_MAX_IN_FLIGHT', 8))
+ADMISSION_MAX_LATENCY_SECONDS = float(st.secrets.get('ADMISSION_MAX_LATENCY_SECONDS', 2.0))
+ADMISSION_MAX_DEFERRED = int(st.secrets.get('ADMISSION_MAX_DEFERRED', 500))
+ADMISSION_WAIT_SECONDS = float(st.secrets.get('ADMISSION_WAIT_SECONDS', 3))
+
+def baserow_overloaded():
+    load = get_baserow_load()
+    return (
+        load.in_flight >= ADMISSION_MAX_IN_FLIGHT
+        or load.recent_latency() > ADMISSION_MAX_LATENCY_SECONDS
+    )
+
+class DeferredSessionWriter:
+    """
+    Writes session rows for deferred starts in the background once Baserow has
+    capacity. Results submitted before their session row exists are queued on
+    the same entry and posted, linked to the row, right after it is written.
+    """
+
+    def __init__(self, max_written=10000):
+        self.lock = threading.Lock()
+        self.tokens = queue.Queue()
+        self.pending = {}             # token -> {"endpoint", "data", "dirty", "results"}
+        self.written = OrderedDict()  # token -> Baserow row id
+        self.max_written = max_written
+        self.thread = threading.Thread(target=self._run, name="deferred-session-writer", daemon=True)
+        self.thread.start()
+
+    def depth(self):
+        with self.lock:
+            return len(self.pending)
+
+    def submit(self, token, endpoint, data):
+        with self.lock:
+            self.pending[token] = {"endpoint": endpoint, "data": dict(data), "dirty": False, "results": []}
+        self.tokens.put(token)
+
+    def amend(self, token, fields):
+        """Merge fields into a row that has not been written yet; False if it is not pending"""
+        with self.lock:
+            entry = self.pending.get(token)
+            if entry is None:
+                return False
+            entry["data"].update(fields)
+            entry["dirty"] = True
+            return True
+
+    def attach_result(self, token, endpoint, data):
+        """Queue a result row behind its unwritten session row; False if the session is not pending"""
+        with self.lock:
+            entry = self.pending.get(token)
+            if entry is None:
+                return False
+            entry["results"].append((endpoint, dict(data)))
+            return True
+
+    def written_id(self, token):
+        with self.lock:
+            return self.written.get(token)
+
+    def _run(self):
+        while True:
+            token = self.tokens.get()
+            row_id = None
+            for attempt in range(3):
+                while baserow_overloaded():
+                    time.sleep(0.5)
+                row_id, done = self._write(token, row_id)
+                if done:
+                    break
+                time.sleep(2 ** attempt)
+            else:
+                with self.lock:
+                    entry = self.pending.pop(token, None)
+                    if row_id is not None:
+                        self._remember(token, row_id)
+                get_baserow_load().count("deferred_failed")
+                print(f"Deferred session write failed for {token}")
+                if entry:
+                    # Still save the results, unlinked if the session row never got written
+                    self._post_results(entry["results"], row_id)
+
+    def _write(self, token, row_id):
+        """POST the row (PATCH it if it was amended mid-write); returns (row id, done)"""
+        with self.lock:
+            entry = self.pending[token]
+            endpoint, data = entry["endpoint"], dict(entry["data"])
+            entry["dirty"] = False
+        if row_id is None:
+            result = baserow_api_request("POST", endpoint, data=data)
+        else:
+            result = baserow_api_request("PATCH", f"{endpoint}{row_id}/", data=data)
+        if not result:
+            return row_id, False
+        with self.lock:
+            if self.pending[token]["dirty"]:
+                return result["id"], False
+            entry = self.pending.pop(token)
+            self._remember(token, result["id"])
+        get_baserow_load().count("deferred_written")
+        self._post_results(entry["results"], result["id"])
+        return result["id"], True
+
+    def _post_results(self, results, row_id):
+        for endpoint, data in results:
+            data["assessment_sessions"] = [row_id] if row_id else []
+            for attempt in range(3):
+                if baserow_api_request("POST", endpoint, data=data):
+                    get_baserow_load().count("deferred_results_written")
+                    break
+                time.sleep(2 ** attempt)
+            else:
+                get_baserow_load().count("deferred_results_failed")
+                print(f"Deferred result write failed for {data.get('session_token')}")
+
+    def _remember(self, token, row_id):
+        self.written[token] = row_id
+        if len(self.written) > self.max_written:
+            self.written.popitem(last=False)
+
+@st.cache_resource(show_spinner=False)
+def get_deferred_session_writer():
+    return DeferredSessionWriter()
+
+def admit_assessment_start():
+    """
+    Decide how a new assessment starts:
+    "admit" (write the session row now) or "defer" (local-only, row queued and
+    written once Baserow has capacity). While the deferred queue is full the
+    user waits up to ADMISSION_WAIT_SECONDS for capacity; after that the start
+    is deferred anyway, so ADMISSION_MAX_DEFERRED is a soft limit and every
+    start still gets a row.
+    """
+    load = get_baserow_load()
+    if not baserow_overloaded():
+        load.count("admitted")
+        return "admit"
+
+    writer = get_deferred_session_writer()
+    if writer.depth() >= ADMISSION_MAX_DEFERRED:
+        load.count("waited")
+        deadline = time.monotonic() + ADMISSION_WAIT_SECONDS
+        with st.spinner("Getting your Quick Check ready..."):
+            while (
+                writer.depth() >= ADMISSION_MAX_DEFERRED
+                and baserow_overloaded()
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.25)
+        if not baserow_overloaded():
+            load.count("admitted")
+            return "admit"
+        if writer.depth() >= ADMISSION_MAX_DEFERRED:
+            load.count("over_soft_limit")
+
+    load.count("deferred")
+    return "defer"
+
+def admission_stats():
+    load = get_baserow_load()
+    with load.lock:
+        counters = dict(load.counters)
+        in_flight = load.in_flight
+    return {
+        "in_flight": in_flight,
+        "recent_latency_seconds": round(load.recent_latency(), 3),
+        "deferred_queue_depth": get_deferred_session_writer().depth(),
+        "counters": counters,
+        "limits": {
+            "max_in_flight": ADMISSION_MAX_IN_FLIGHT,
+            "max_latency_seconds": ADMISSION_MAX_LATENCY_SECONDS,
+            "max_deferred": ADMISSION_MAX_DEFERRED,
+            "wait_seconds": ADMISSION_WAIT_SECONDS,
+        },
+    }
+
+# Endpoint = https://inventory-health-check.streamlit.app/?admission=1
+if st.query_params.get("admission") == "1":
+    st.json(admission_stats())
+    st.stop()
+
+# -------------------------------
+# Abandoned session sweeper
+# -------------------------------
+SWEEP_ENABLED = str(st.secrets.get('SWEEP_ENABLED', 'false')).lower() == 'true'
+SWEEP_INTERVAL_HOURS = float(st.secrets.get('SWEEP_INTERVAL_HOURS', 24))
+SWEEP_CUTOFF_DAYS = int(st.secrets.get('SWEEP_CUTOFF_DAYS', 2))
+SWEEP_PAGE_SIZE = int(st.secrets.get('SWEEP_PAGE_SIZE', 200))
+SWEEP_BATCH_SIZE = int(st.secrets.get('SWEEP_BATCH_SIZE', 50))
+SWEEP_CONCURRENCY = int(st.secrets.get('SWEEP_CONCURRENCY', 2))
+SWEEP_PAUSE_SECONDS = float(st.secrets.get('SWEEP_PAUSE_SECONDS', 1))
+SWEEP_ABANDONED_FIELD = st.secrets.get('SWEEP_ABANDONED_FIELD', 'abandoned')
+SWEEP_CHECKPOINT_PATH = st.secrets.get('SWEEP_CHECKPOINT_PATH', 'sweep_checkpoint.json')
+SWEEP_TABLE_ID = st.secrets.get('SESSIONS_TABLE_ID')
+
+def load_sweep_checkpoint():
+    try:
+        with open(SWEEP_CHECKPOINT_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_sweep_checkpoint(checkpoint):
+    checkpoint["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    try:
+        with open(SWEEP_CHECKPOINT_PATH + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(SWEEP_CHECKPOINT_PATH + ".tmp", SWEEP_CHECKPOINT_PATH)
+    except OSError as e:
+        print(f"Sweep checkpoint write error: {e}")
+
+def iter_abandoned_sessions(cutoff_date, skip):
+    """
+    Yield pages of incomplete, not yet abandoned sessions created before the cutoff.
+    Marked rows drop out of the filter, so paging restarts at the front every time;
+    `skip()` is the number of rows left ahead of the cursor by failed updates.
+    """
+    while True:
+        ahead = skip()
+        page = baserow_api_request(
+            "GET",
+            f"database/rows/table/{SWEEP_TABLE_ID}/",
+            params={
+                "size": str(SWEEP_PAGE_SIZE),
+                "page": str(ahead // SWEEP_PAGE_SIZE + 1),
+                "filter_type": "AND",
+                "filter__completed__boolean": "false",
+                f"filter__{SWEEP_ABANDONED_FIELD}__boolean": "false",
+                "filter__created_date__date_before": cutoff_date,
+                "include": SWEEP_ABANDONED_FIELD,
+            },
+            background=True
+        )
+        if page is None:
+            raise RuntimeError("Sweep: could not list sessions")
+        rows = page.get("results", [])[ahead % SWEEP_PAGE_SIZE:]
+        if not rows:
+            return
+        yield rows
+        if not page.get("next"):
+            return
+
+def mark_sessions_abandoned(row_ids):
+    """One batch update; returns True when Baserow accepted it"""
+    result = baserow_api_request(
+        "PATCH",
+        f"database/rows/table/{SWEEP_TABLE_ID}/batch/",
+        data={"items": [{"id": row_id, SWEEP_ABANDONED_FIELD: True} for row_id in row_ids]},
+        background=True
+    )
+    return result is not None
+
+def sweep_abandoned_sessions():
+    """Mark every incomplete session older than SWEEP_CUTOFF_DAYS as abandoned"""
+    checkpoint = load_sweep_checkpoint()
+    if checkpoint.get("finished", True) or "cutoff" not in checkpoint:
+        # New run; an unfinished checkpoint is resumed with its original cutoff
+        cutoff = (datetime.now() - timedelta(days=SWEEP_CUTOFF_DAYS)).strftime("%Y-%m-%d")
+        checkpoint = {"cutoff": cutoff, "marked": 0, "failed": 0, "finished": False,
+                      "started_at": datetime.now().isoformat(timespec="seconds")}
+    failed_this_run = 0
+
+    with ThreadPoolExecutor(max_workers=SWEEP_CONCURRENCY, thread_name_prefix="session-sweeper") as pool:
+        for rows in iter_abandoned_sessions(checkpoint["cutoff"], lambda: failed_this_run):
+            while baserow_overloaded():
+                time.sleep(SWEEP_PAUSE_SECONDS)
+
+            batches = [
+                [row["id"] for row in rows[i:i + SWEEP_BATCH_SIZE]]
+                for i in range(0, len(rows), SWEEP_BATCH_SIZE)
+            ]
+            for batch, ok in zip(batches, pool.map(mark_sessions_abandoned, batches)):
+                if ok:
+                    checkpoint["marked"] += len(batch)
+                else:
+                    checkpoint["failed"] += len(batch)
+                    failed_this_run += len(batch)
+
+            save_sweep_checkpoint(checkpoint)
+            time.sleep(SWEEP_PAUSE_SECONDS)
+
+    checkpoint["finished"] = True
+    checkpoint["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    save_sweep_checkpoint(checkpoint)
+    print(f"Sweep finished: {checkpoint['marked']} marked abandoned, {checkpoint['failed']} failed")
+
+def sweep_due(checkpoint):
+    """True when a run is unfinished or the last one finished over SWEEP_INTERVAL_HOURS ago"""
+    if not checkpoint.get("finished", True):
+        return True
+    try:
+        last_finished = datetime.fromisoformat(checkpoint["finished_at"])
+    except (KeyError, TypeError, ValueError):
+        # Missing or malformed checkpoint: sweep rather than stall
+        return True
+    return datetime.now() - last_finished >= timedelta(hours=SWEEP_INTERVAL_HOURS)
+
+def _session_sweeper_loop():
+    while True:
+        try:
+            if sweep_due(load_sweep_checkpoint()):
+                sweep_abandoned_sessions()
+        except Exception as e:
+            print(f"Sweep error: {e}")
+        time.sleep(600)
+
+@st.cache_resource(show_spinner=False)
+def start_session_sweeper():
+    """Start one background sweeper per server process; runs are spaced by the checkpoint"""
+    thread = threading.Thread(target=_session_sweeper_loop, name="session-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+if SWEEP_ENABLED and SWEEP_TABLE_ID:
+    start_session_sweeper()
+
 # -------------------------------
 # Page configuration
 # -------------------------------
@@ -124,6 +538,15 @@ HEALTH_MAP = {
     "Critical": "Critical"
 }
 
+# Compiled once at startup: option text -> answer index, and the max possible score
+QUESTION_OPTION_INDEX = [
+    {option: i for i, option in enumerate(q["options"])} for q in QUESTIONS
+]
+MAX_SCORE = sum(max(q["scores"]) for q in QUESTIONS)
+
+# Bump whenever QUESTIONS or scoring changes; keys the precomputed outcome table
+QUESTION_BANK_VERSION = "v1"
+
 # -------------------------------
 # Question's Progress Colors
 # -------------------------------
@@ -158,6 +581,87 @@ if "session_token" not in st.session_state:
 if "session_id" not in st.session_state:
     st.session_state.session_id = None
 
+if "visitor_id" not in st.session_state:
+    st.session_state.visitor_id = str(uuid.uuid4())
+
+# -------------------------------
+# Funnel event log
+# -------------------------------
+EVENT_LOG_DIR = st.secrets.get('EVENT_LOG_DIR', 'event_logs')
+EVENT_LOG_MAX_EVENTS = int(st.secrets.get('EVENT_LOG_MAX_EVENTS', 500))
+EVENT_LOG_MAX_SECONDS = float(st.secrets.get('EVENT_LOG_MAX_SECONDS', 60))
+EVENT_LOG_FIELDS = ["timestamp", "visitor_id", "session_token", "event", "question", "detail"]
+
+class FunnelEventWriter:
+    """Buffers funnel events off the script thread and writes rotated .csv.gz files"""
+
+    def __init__(self, directory, max_events, max_seconds):
+        self.directory = directory
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="funnel-event-writer", daemon=True)
+        self.thread.start()
+
+    def log(self, event):
+        self.events.put_nowait(event)
+
+    def close(self):
+        """Flush whatever is buffered; called at interpreter exit"""
+        self.events.put(None)
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        buffer = []
+        deadline = time.monotonic() + self.max_seconds
+        while True:
+            try:
+                event = self.events.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                event = {}
+            if event is None:
+                self._flush(buffer)
+                return
+            if event:
+                buffer.append(event)
+            if len(buffer) >= self.max_events or time.monotonic() >= deadline:
+                self._flush(buffer)
+                buffer = []
+                deadline = time.monotonic() + self.max_seconds
+
+    def _flush(self, buffer):
+        if not buffer:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"events-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.csv.gz"
+            path = os.path.join(self.directory, name)
+            # Write under a temp name so readers never pick up a half-written file
+            with gzip.open(path + ".tmp", "wt", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=EVENT_LOG_FIELDS)
+                writer.writeheader()
+                writer.writerows(buffer)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Event log write error: {e}")
+
+@st.cache_resource(show_spinner=False)
+def get_event_writer():
+    writer = FunnelEventWriter(EVENT_LOG_DIR, EVENT_LOG_MAX_EVENTS, EVENT_LOG_MAX_SECONDS)
+    atexit.register(writer.close)
+    return writer
+
+def log_event(event, question=None, detail=""):
+    """Record a funnel event; only enqueues, the file write happens on the writer thread"""
+    get_event_writer().log({
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "visitor_id": st.session_state.get("visitor_id"),
+        "session_token": st.session_state.get("session_token"),
+        "event": event,
+        "question": question if question is not None else "",
+        "detail": detail,
+    })
+
 # -------------------------------
 # Segmented Progress Bar Function
 # -------------------------------
@@ -184,9 +688,8 @@ def segmented_progress_bar(current_index, total):
         unsafe_allow_html=True
     )
 
-def semicircle_score(score, color):
-    st.markdown(
-        f"""
+def semicircle_score_html(score, color):
+    return f"""
         <div style="display: flex; justify-content: center;">
             <div style="
                 width: 220px;
@@ -209,9 +712,10 @@ def semicircle_score(score, color):
                 </div>
             </div>
         </div>
-        """,
-        unsafe_allow_html=True
-    )
+        """
+
+def semicircle_score(score, color):
+    st.markdown(semicircle_score_html(score, color), unsafe_allow_html=True)
 
 st.markdown(
     """
@@ -235,6 +739,10 @@ st.markdown(
 
 # ---------- Landing Page ----------
 def landing_page():
+    if not st.session_state.get("landing_logged"):
+        log_event("landing_viewed")
+        st.session_state.landing_logged = True
+
     col1, col2 = st.columns([1, 8])
 
     with col1:
@@ -332,6 +840,7 @@ def landing_page():
         if st.button("▶ Start the Quick Check", use_container_width=True):
             #if "session_id" not in st.session_state:                
             create_assessment_session()
+            log_event("start_clicked")
 
             # Reset quiz state
             st.session_state.current_question = 0
@@ -355,9 +864,19 @@ def create_assessment_session():
         "created_date": datetime.now().strftime("%Y-%m-%d"),
     }
     
+    endpoint = f"database/rows/table/{st.secrets['SESSIONS_TABLE_ID']}/"
+
+    decision = admit_assessment_start()
+    if decision == "defer":
+        # Local-only start: the quiz runs on the token, the row is written later
+        get_deferred_session_writer().submit(session_token, endpoint, session_data)
+        st.session_state.session_id = None
+        st.session_state.session_token = session_token
+        return
+    
     result = baserow_api_request(
         "POST",
-        f"database/rows/table/{st.secrets['SESSIONS_TABLE_ID']}/",
+        endpoint,
         data=session_data
     )
     
@@ -366,11 +885,21 @@ def create_assessment_session():
         st.session_state.session_token = session_token
 
 
+def resolve_session_id():
+    """Session row id, picking it up from the deferred writer once a deferred start's row exists"""
+    if st.session_state.get("session_id") is None and st.session_state.get("session_token"):
+        st.session_state.session_id = get_deferred_session_writer().written_id(
+            st.session_state.session_token
+        )
+    return st.session_state.get("session_id")
+
+
 def reset_session():
     """Simple session reset for restart buttons"""
     # Clear critical session state
     for key in ['session_id', 'session_token', 'session_finalized', 
-                'answers', 'current_question', 'email_submitted']:
+                'answers', 'current_question', 'email_submitted',
+                'landing_logged', 'booking_logged']:
         if key in st.session_state:
             del st.session_state[key]
 
@@ -405,6 +934,7 @@ def quiz_page():
     with col1:
         if q_index > 0:
             if st.button("‹ Back"):
+                log_event("back_clicked", question=q_index + 1)
                 st.session_state.current_question -= 1
                 st.rerun()
 
@@ -412,10 +942,12 @@ def quiz_page():
         button_text = "Next ›" if q_index < total_questions - 1 else "Finish"
         if st.button(button_text):
             st.session_state.answers[q_index] = answer
+            log_event("question_answered", question=q_index + 1, detail=question_data["options"].index(answer))
 
             if q_index < total_questions - 1:
                 st.session_state.current_question += 1
             else:                
+                log_event("finish_clicked")
                 st.session_state.page = "results"
 
             st.rerun()
@@ -436,9 +968,16 @@ def finalize_assessment_session(score, health_label):
         "completed_at": datetime.now().strftime("%Y-%m-%d")
     }
 
+    session_id = resolve_session_id()
+    if session_id is None:
+        # Row still queued from a deferred start: write it already completed
+        if get_deferred_session_writer().amend(st.session_state.session_token, payload):
+            st.session_state.session_finalized = True
+        return
+
     baserow_api_request(
         "PATCH",
-        f"database/rows/table/{st.secrets['SESSIONS_TABLE_ID']}/{st.session_state.session_id}/",
+        f"database/rows/table/{st.secrets['SESSIONS_TABLE_ID']}/{session_id}/",
         data=payload
     )
 
@@ -449,16 +988,18 @@ def finalize_assessment_session(score, health_label):
 # -------------------------------
 # Result calculation
 # -------------------------------
-def calculate_score():
+def calculate_score(answers=None):
+    if answers is None:
+        answers = st.session_state.answers
+
     total_score = 0
-    max_score = 0
+    max_score = MAX_SCORE
 
     for i, q in enumerate(QUESTIONS):
-        selected_answer = st.session_state.answers.get(i)
+        selected_answer = answers.get(i)
         if selected_answer:
-            answer_index = q["options"].index(selected_answer)
+            answer_index = QUESTION_OPTION_INDEX[i][selected_answer]
             total_score += q["scores"][answer_index]
-        max_score += max(q["scores"])
 
     percentage = int((total_score / max_score) * 100)
     return total_score, max_score, percentage
@@ -487,7 +1028,7 @@ def score_band(percentage):
         }
     
 
-def calculate_question_scores():
+def calculate_question_scores(answers=None):
     """
     Returns per-question scores as a dict:
     {
@@ -496,12 +1037,15 @@ def calculate_question_scores():
         ...
     }
     """
+    if answers is None:
+        answers = st.session_state.answers
+
     scores = {}
 
     for i, q in enumerate(QUESTIONS):
-        selected_answer = st.session_state.answers.get(i)
+        selected_answer = answers.get(i)
         if selected_answer:
-            answer_index = q["options"].index(selected_answer)
+            answer_index = QUESTION_OPTION_INDEX[i][selected_answer]
             scores[f"q{i+1}_score"] = q["scores"][answer_index]
         else:
             scores[f"q{i+1}_score"] = 0
@@ -509,6 +1053,89 @@ def calculate_question_scores():
     return scores
 
 
+# -------------------------------
+# Precomputed outcomes
+# -------------------------------
+def score_badge_html(band):
+    return f"""
+        <div style="text-align:center; margin-top:8px;">
+            <p style="font-size:1.2rem; font-weight:600;">
+                Inventory Health Score
+            </p>
+            <span style="
+                display:inline-block;
+                padding:6px 14px;
+                border-radius:999px;
+                background-color:{band['color']};
+                color:white;
+                font-size:0.85rem;
+                font-weight:600;
+            ">
+                {band['label']}
+            </span>
+        </div>
+        """
+
+def band_summary_html(band):
+    return f"""
+        <div style="text-align:center;">
+            <h3>{band['headline']}</h3>
+            <p style="font-size:1.05rem; color:#374151;">
+                {band['message']}
+            </p>
+        </div>
+        """
+
+def build_outcome(answers):
+    """Everything the results page needs for one answer set, computed by the live scoring code"""
+    total_score, max_score, percentage = calculate_score(answers)
+    band = score_band(percentage)
+    return {
+        "percentage": percentage,
+        "band": band,
+        "question_scores": calculate_question_scores(answers),
+        "score_html": semicircle_score_html(percentage, band["color"]),
+        "badge_html": score_badge_html(band),
+        "summary_html": band_summary_html(band),
+    }
+
+def answer_indexes(answers):
+    """Answer index tuple for a complete answer set, or None while any question is unanswered"""
+    indexes = []
+    for i in range(len(QUESTIONS)):
+        selected_answer = answers.get(i)
+        if not selected_answer:
+            return None
+        indexes.append(QUESTION_OPTION_INDEX[i][selected_answer])
+    return tuple(indexes)
+
+def pack_answer_indexes(indexes):
+    """Mixed-radix packing with Q1 most significant, matching itertools.product order"""
+    key = 0
+    for q, index in zip(QUESTIONS, indexes):
+        key = key * len(q["options"]) + index
+    return key
+
+@st.cache_resource(show_spinner=False)
+def build_outcome_table(version):
+    """Outcome for every possible answer set of the given question-bank version"""
+    table = []
+    for indexes in itertools.product(*(range(len(q["options"])) for q in QUESTIONS)):
+        answers = {i: QUESTIONS[i]["options"][index] for i, index in enumerate(indexes)}
+        table.append(build_outcome(answers))
+    return table
+
+# Bound once per script run: going through st.cache_resource on every lookup
+# costs more than rescoring
+OUTCOME_TABLE = build_outcome_table(QUESTION_BANK_VERSION)
+
+def lookup_outcome(answers):
+    indexes = answer_indexes(answers)
+    if indexes is None:
+        return build_outcome(answers)
+    return OUTCOME_TABLE[pack_answer_indexes(indexes)]
+
+
 # -------------------------------
 # Contact lookup or creation
 # -------------------------------
@@ -551,8 +1178,10 @@ def get_or_create_contact(email):
 # Results page
 # -------------------------------
 def results_page():    
-    total_score, max_score, percentage = calculate_score()
-    band = score_band(percentage)
+    outcome = lookup_outcome(st.session_state.answers)
+    percentage = outcome["percentage"]
+    max_score = MAX_SCORE
+    band = outcome["band"]
 
     finalize_assessment_session(
         score=percentage,
@@ -562,43 +1191,13 @@ def results_page():
     st.markdown("### Inventory Health Results")
     st.markdown("---")
 
-    semicircle_score(percentage, band["color"])
+    st.markdown(outcome["score_html"], unsafe_allow_html=True)
 
-    st.markdown(
-        f"""
-        <div style="text-align:center; margin-top:8px;">
-            <p style="font-size:1.2rem; font-weight:600;">
-                Inventory Health Score
-            </p>
-            <span style="
-                display:inline-block;
-                padding:6px 14px;
-                border-radius:999px;
-                background-color:{band['color']};
-                color:white;
-                font-size:0.85rem;
-                font-weight:600;
-            ">
-                {band['label']}
-            </span>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(outcome["badge_html"], unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    st.markdown(
-        f"""
-        <div style="text-align:center;">
-            <h3>{band['headline']}</h3>
-            <p style="font-size:1.05rem; color:#374151;">
-                {band['message']}
-            </p>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(outcome["summary_html"], unsafe_allow_html=True)
 
     st.markdown("<br><br>", unsafe_allow_html=True)
 
@@ -676,6 +1275,7 @@ def results_page():
                             )
                             if not success:
                                 st.error("We couldn't save your results. Please try again.")
+                            log_event("email_submitted", detail="saved" if success else "save_failed")
                             st.session_state.email_submitted = True
                             st.success("✅ Your report is being prepared and will arrive shortly.")
                             st.session_state.page = "booking"
@@ -692,6 +1292,7 @@ def results_page():
         if st.button("Finish → Book a Call"):
             # ✅ Ensure session is finalized BEFORE navigating
             finalize_assessment_session(percentage, band["label"])          
+            log_event("book_call_clicked", detail=band["label"])
                     
             # ✅ Navigate to booking page
             st.session_state.page = "booking"
@@ -701,30 +1302,45 @@ def results_page():
 # -------------------------------
 # Save assessment result
 # -------------------------------
-def save_result_to_baserow(contact_id, percentage, max_score, health_label):
-    """Save assessment result to Baserow"""
+def build_result_payload(contact_id, percentage, max_score, health_label):
+    """Row data for the results table, including per-question scores"""
     
     # CRITICAL FIX: Check valid options for 'health_level' Single Select field
     # You need to determine what text options are valid in your Baserow table
     
-    question_scores = calculate_question_scores()
+    question_scores = lookup_outcome(st.session_state.answers)["question_scores"]
+    session_id = resolve_session_id()
 
-    result_data = {
+    return {
         "contact": [contact_id],
         "overall_score": percentage,
         "max_score_possible": max_score,
         "health_level": HEALTH_MAP.get(health_label),
-        "assessment_version": "v1",
+        "assessment_version": QUESTION_BANK_VERSION,
         "report_status": "requested",
         "created_date": datetime.now().strftime("%Y-%m-%d"),  # European format YYYY-MM-DD
-        "assessment_sessions": [st.session_state.session_id] if "session_id" in st.session_state else [],
+        "assessment_sessions": [session_id] if session_id else [],
         "session_token": st.session_state.session_token,
         **question_scores
     }
+
+def save_result_to_baserow(contact_id, percentage, max_score, health_label):
+    """Save assessment result to Baserow"""
+    result_data = build_result_payload(contact_id, percentage, max_score, health_label)
+    endpoint = f"database/rows/table/{st.secrets['RESULTS_TABLE_ID']}/"
+
+    if not result_data["assessment_sessions"] and st.session_state.get("session_token"):
+        # Deferred start whose session row is still queued: post the result behind it so it gets linked
+        if get_deferred_session_writer().attach_result(st.session_state.session_token, endpoint, result_data):
+            st.success("✅ Result saved successfully!")
+            return True
+        # The row was written in the meantime
+        session_id = resolve_session_id()
+        result_data["assessment_sessions"] = [session_id] if session_id else []
     
     result = baserow_api_request(
         "POST",
-        f"database/rows/table/{st.secrets['RESULTS_TABLE_ID']}/",
+        endpoint,
         data=result_data
     )
     
@@ -742,6 +1358,10 @@ def booking_page():
     """
     Final booking page - opens Cal.com in new tab with session token
     """
+    if not st.session_state.get("booking_logged"):
+        log_event("booking_viewed")
+        st.session_state.booking_logged = True
+
     st.markdown("### Book Your Inventory Alignment Call")
     st.markdown(
         """
@@ -806,10 +1426,21 @@ def booking_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("↺ Retake Assessment", use_container_width=True):
+            log_event("retake_clicked")
             reset_session()
             st.session_state.page = "landing"
             st.rerun()
 # -------------------------------
+# Endpoint to ping and keep app awake; Endpoint =  https://inventory-health-check.streamlit.app/?ping=1 
+# Keeps the Streamlit container itself awake. Handled after the startup work
+# above (connection warmer, caches, outcome table), so after a restart the
+# pinger alone brings up the warm Baserow pool.
+# -------------------------------
+if st.query_params.get("ping") == "1":
+    st.write("OK")
+    st.stop()
+
+# -------------------------------
 # Page Routing
 # -------------------------------
 if st.session_state.page == "landing":
@@ -0,0 +1,163 @@
+"""
+Exhaustive check of the precomputed outcome table in app.py.
+
+Every possible answer set is scored by a reference copy of the scoring and
+results-page markup from before the table existed (kept here, independent of
+the app code that builds the table). Every field of the table entry is
+compared with it: percentage, band, question scores and the score, badge and
+summary HTML. The entry lookup_outcome() returns for those answers is checked
+too.
+
+Usage (from the repo root):
+    python benchmarks/check_outcome_table.py
+
+run_benchmarks.py runs the same check before timing anything. Exits non-zero
+on any mismatch.
+"""
+import itertools
+import sys
+import tempfile
+
+# score_band() as it was before the outcome table: (min percentage, band)
+REFERENCE_BANDS = [
+    (70, {
+        "label": "Healthy",
+        "color": "#16a34a",
+        "headline": "Your Inventory Is in Good Shape",
+        "message": "You have solid control over your inventory, with only minor optimization opportunities."
+    }),
+    (40, {
+        "label": "At Risk",
+        "color": "#f97316",
+        "headline": "Your Inventory Is Leaking Money",
+        "message": "You're carrying avoidable costs and inefficiencies that will compound if left unchecked."
+    }),
+    (0, {
+        "label": "Critical",
+        "color": "#ef4444",
+        "headline": "Your Inventory Is Actively Hurting Cash Flow",
+        "message": "Excess stock, stockouts, and manual fixes are draining time and working capital."
+    }),
+]
+
+REFERENCE_SCORE_HTML = """
+<div style="display: flex; justify-content: center;">
+    <div style="
+        width: 220px;
+        height: 110px;
+        background: {color};
+        border-radius: 220px 220px 0 0;
+        position: relative;
+        overflow: hidden;
+    ">
+        <div style="
+            position: absolute;
+            bottom: 10px;
+            width: 100%;
+            text-align: center;
+            color: white;
+            font-size: 2rem;
+            font-weight: 700;
+        ">
+            {score} / 100
+        </div>
+    </div>
+</div>
+"""
+
+REFERENCE_BADGE_HTML = """
+<div style="text-align:center; margin-top:8px;">
+    <p style="font-size:1.2rem; font-weight:600;">
+        Inventory Health Score
+    </p>
+    <span style="
+        display:inline-block;
+        padding:6px 14px;
+        border-radius:999px;
+        background-color:{color};
+        color:white;
+        font-size:0.85rem;
+        font-weight:600;
+    ">
+        {label}
+    </span>
+</div>
+"""
+
+REFERENCE_SUMMARY_HTML = """
+<div style="text-align:center;">
+    <h3>{headline}</h3>
+    <p style="font-size:1.05rem; color:#374151;">
+        {message}
+    </p>
+</div>
+"""
+
+
+def _squash(html):
+    """Collapse whitespace, which the browser ignores, so indentation changes don't count"""
+    return " ".join(html.split())
+
+
+def reference_outcome(questions, indexes):
+    total_score = sum(q["scores"][index] for q, index in zip(questions, indexes))
+    max_score = sum(max(q["scores"]) for q in questions)
+    percentage = int((total_score / max_score) * 100)
+    band = next(band for minimum, band in REFERENCE_BANDS if percentage >= minimum)
+    return {
+        "percentage": percentage,
+        "band": band,
+        "question_scores": {
+            f"q{i+1}_score": q["scores"][index] for i, (q, index) in enumerate(zip(questions, indexes))
+        },
+        "score_html": _squash(REFERENCE_SCORE_HTML.format(color=band["color"], score=percentage)),
+        "badge_html": _squash(REFERENCE_BADGE_HTML.format(**band)),
+        "summary_html": _squash(REFERENCE_SUMMARY_HTML.format(**band)),
+    }
+
+
+def check_outcome_table(app):
+    """Returns (answer sets checked, [(answer indexes, mismatched fields)])"""
+    table = app.OUTCOME_TABLE
+    mismatches = []
+    checked = 0
+    option_ranges = [range(len(q["options"])) for q in app.QUESTIONS]
+    for indexes in itertools.product(*option_ranges):
+        checked += 1
+        expected = reference_outcome(app.QUESTIONS, indexes)
+        outcome = table[app.pack_answer_indexes(indexes)]
+        fields = [
+            field for field, value in expected.items()
+            if (_squash(outcome[field]) if field.endswith("_html") else outcome[field]) != value
+        ]
+        answers = {i: app.QUESTIONS[i]["options"][index] for i, index in enumerate(indexes)}
+        if app.lookup_outcome(answers) is not outcome:
+            fields.append("lookup_outcome")
+        if fields:
+            mismatches.append((indexes, fields))
+    if len(table) != checked:
+        mismatches.append(((), [f"table has {len(table)} entries for {checked} answer sets"]))
+    return checked, mismatches
+
+
+def main():
+    from run_benchmarks import load_app
+
+    with tempfile.TemporaryDirectory() as event_log_dir:
+        # Loading the app makes no Baserow calls with the warmer off, so no server is needed
+        app = load_app("http://127.0.0.1:9/api", event_log_dir)
+        try:
+            checked, mismatches = check_outcome_table(app)
+        finally:
+            app.get_event_writer().close()
+
+    if mismatches:
+        print(f"Outcome table disagrees with the reference scoring for {len(mismatches)} of {checked} answer sets, "
+              f"e.g. {mismatches[0]}")
+        return 1
+    print(f"Outcome table matches the reference scoring for all {checked} answer sets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Micro-benchmarks for the hot functions in app.py.
+
+Runs without a Streamlit server or network access: app.py is loaded against
+a stand-in `streamlit` module that stubs the UI calls but keeps the real
+`st.cache_resource`/`st.cache_data` (they work in bare mode, so their
+per-call cost is measured), and Baserow calls go to a stub HTTP server on
+localhost.
+
+Usage (from the repo root):
+    python benchmarks/run_benchmarks.py                     # compare with baseline
+    python benchmarks/run_benchmarks.py --update-baseline   # record a new baseline
+    python benchmarks/run_benchmarks.py --threshold 0.25    # fail above +25%
+    python benchmarks/run_benchmarks.py --min-delta-us 1    # ignore slowdowns under 1 us
+    python benchmarks/run_benchmarks.py --hard-limit 0.8    # but always fail above +80%
+
+Each function is timed back to back with a fixed pure-Python calibration loop
+and compared by its cost relative to that loop, so the baseline survives a
+slower or busier machine.
+
+Before timing, the precomputed outcome table is checked exhaustively against
+reference scoring (see check_outcome_table.py, which also runs on its own). Exits non-zero when that check fails or when any
+function is slower than its baseline by more than the threshold. Slowdowns
+under --min-delta-us are treated as timer noise, except that a function more
+than --hard-limit slower than its own baseline always fails, so the cheapest
+functions are still gated.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import timeit
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import streamlit
+from check_outcome_table import check_outcome_table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.5
+# Sub-microsecond functions jitter by more than the threshold on their own, so
+# slowdowns below this absolute size are ignored ...
+DEFAULT_MIN_DELTA_US = 0.5
+# ... unless the function got this much slower relative to its own cost
+DEFAULT_HARD_LIMIT = 1.0
+
+
+# -------------------------------
+# Local Baserow stub
+# -------------------------------
+class _StubBaserowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = b'{"id": 1, "results": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubBaserowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# -------------------------------
+# Streamlit stand-in
+# -------------------------------
+class _SessionState(dict):
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __delattr__(self, key):
+        del self[key]
+
+
+def _columns(spec, **kwargs):
+    count = spec if isinstance(spec, int) else len(spec)
+    return [contextlib.nullcontext() for _ in range(count)]
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+def fake_streamlit(secrets):
+    st = types.ModuleType("streamlit")
+    st.session_state = _SessionState()
+    st.secrets = secrets
+    st.query_params = {}
+    st.cache_resource = streamlit.cache_resource
+    st.cache_data = streamlit.cache_data
+    st.columns = _columns
+    st.button = lambda *args, **kwargs: False
+    st.radio = lambda label, options, index=0, **kwargs: options[index]
+    st.__getattr__ = lambda name: _noop
+
+    components = types.ModuleType("streamlit.components")
+    components_v1 = types.ModuleType("streamlit.components.v1")
+    components.v1 = components_v1
+    st.components = components
+    return {
+        "streamlit": st,
+        "streamlit.components": components,
+        "streamlit.components.v1": components_v1,
+    }
+
+
+def load_app(base_url, event_log_dir):
+    secrets = {
+        "BASEROW_BASE_URL": base_url,
+        "BASEROW_TOKEN": "benchmark",
+        "SESSIONS_TABLE_ID": "1",
+        "RESULTS_TABLE_ID": "2",
+        "CONTACTS_TABLE_ID": "3",
+        "WARMUP_ENABLED": "false",
+        "EVENT_LOG_DIR": event_log_dir,
+    }
+    sys.modules.update(fake_streamlit(secrets))
+    spec = importlib.util.spec_from_file_location("app", os.path.join(REPO_ROOT, "app.py"))
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    return app
+
+
+# -------------------------------
+# Benchmarks
+# -------------------------------
+def build_benchmarks(app):
+    st = app.st
+    st.session_state.answers = {i: q["options"][1] for i, q in enumerate(app.QUESTIONS)}
+    st.session_state.session_id = 1
+    st.session_state.session_token = "benchmark-token"
+
+    return {
+        "calculate_score": app.calculate_score,
+        "calculate_question_scores": app.calculate_question_scores,
+        "score_band": lambda: app.score_band(55),
+        "segmented_progress_bar": lambda: app.segmented_progress_bar(2, len(app.QUESTIONS)),
+        "semicircle_score": lambda: app.semicircle_score(55, "#f97316"),
+        "build_result_payload": lambda: app.build_result_payload(1, 55, 100, "At Risk"),
+        "outcome_lookup": lambda: app.lookup_outcome(st.session_state.answers),
+        "baserow_api_request": lambda: app.baserow_api_request(
+            "GET", "database/rows/table/1/", params={"size": "1"}
+        ),
+    }
+
+
+def _calibration_workload():
+    total = 0
+    for i in range(200):
+        total += len(f"<div>{i}</div>")
+    return {"total": total}
+
+
+def time_call(func, rounds=7):
+    """
+    Best seconds per call, and the median cost relative to the calibration loop
+    timed immediately before it in each round.
+    """
+    func_timer = timeit.Timer(func)
+    calibration_timer = timeit.Timer(_calibration_workload)
+    func_number, _ = func_timer.autorange()
+    calibration_number, _ = calibration_timer.autorange()
+
+    seconds, relative = [], []
+    for _ in range(rounds):
+        calibration = calibration_timer.timeit(calibration_number) / calibration_number
+        elapsed = func_timer.timeit(func_number) / func_number
+        seconds.append(elapsed)
+        relative.append(elapsed / calibration)
+    return min(seconds), statistics.median(relative)
+
+
+def run(threshold, min_delta_us, hard_limit, update_baseline):
+    server = start_stub_server()
+    with tempfile.TemporaryDirectory() as event_log_dir:
+        app = load_app(f"http://127.0.0.1:{server.server_port}/api", event_log_dir)
+        try:
+            checked, mismatches = check_outcome_table(app)
+            if mismatches:
+                print(f"Outcome table disagrees with the reference scoring for {len(mismatches)} of {checked} answer sets, "
+                      f"e.g. {mismatches[0]}")
+                return 1
+            print(f"Outcome table matches the reference scoring for all {checked} answer sets\n")
+            results = {name: time_call(func) for name, func in build_benchmarks(app).items()}
+        finally:
+            # Flush now: the writer's atexit flush would recreate the deleted temp directory
+            app.get_event_writer().close()
+            server.shutdown()
+
+    if update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({
+                "seconds_per_call": {name: seconds for name, (seconds, _) in results.items()},
+                "relative_cost": {name: relative for name, (_, relative) in results.items()},
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for name, (seconds, _) in results.items():
+            print(f"{name:28s} {seconds * 1e6:12.2f} us")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)["relative_cost"]
+
+    regressions = []
+    for name, (seconds, relative) in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:28s} {seconds * 1e6:12.2f} us   (no baseline)")
+            continue
+        change = relative / reference - 1
+        slowdown_us = seconds * 1e6 * change / (1 + change)
+        regressed = change > hard_limit or (change > threshold and slowdown_us > min_delta_us)
+        status = "REGRESSION" if regressed else "ok"
+        print(f"{name:28s} {seconds * 1e6:12.2f} us   {change:+7.1%}   {status}")
+        if regressed:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\n{len(regressions)} function(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown vs baseline as a fraction (default: %(default)s)")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help="slowdowns smaller than this many microseconds do not fail (default: %(default)s)")
+    parser.add_argument("--hard-limit", type=float, default=DEFAULT_HARD_LIMIT,
+                        help="slowdown as a fraction that fails regardless of --min-delta-us (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the current timings to baseline.json instead of comparing")
+    args = parser.parse_args()
+    sys.exit(run(args.threshold, args.min_delta_us, args.hard_limit, args.update_baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Incremental export of assessment results for BI.
+
+Pulls rows added to RESULTS_TABLE_ID, SESSIONS_TABLE_ID and CONTACTS_TABLE_ID
+since the last run into a local SQLite database. Each result keeps the ids of
+its session and contact (from the `assessment_sessions` and `contact` link
+fields); the `results_joined` view joins them locally, so session and contact
+columns always show the latest synced values. Rows exported earlier whose
+values change afterwards (sessions completed or marked abandoned later,
+contact details, result report status) are re-synced within the last
+--resync-days. Baserow credentials come from .streamlit/secrets.toml (the same
+file the app uses); environment variables of the same name override it.
+
+Usage:
+    python export_results.py                          # -> exports/inventory_health.sqlite
+    python export_results.py --db /data/bi.sqlite --concurrency 8
+"""
+import argparse
+import math
+import os
+import sqlite3
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+
+CONFIG_KEYS = ["BASEROW_BASE_URL", "BASEROW_TOKEN", "RESULTS_TABLE_ID", "SESSIONS_TABLE_ID", "CONTACTS_TABLE_ID"]
+
+# Copied straight from the result row; the link ids are added by result_record()
+RESULT_BASE_COLUMNS = [
+    "id", "created_date", "overall_score", "max_score_possible", "health_level",
+    "assessment_version", "report_status", "session_token",
+    "q1_score", "q2_score", "q3_score", "q4_score", "q5_score",
+]
+
+RESULT_COLUMNS = RESULT_BASE_COLUMNS + ["session_id", "contact_id"]
+
+SESSION_COLUMNS = [
+    "id", "session_token", "created_date", "completed", "completed_at",
+    "final_score", "health_band", "abandoned",
+]
+
+CONTACT_COLUMNS = ["id", "email", "first_name", "last_name", "company_name", "created_date"]
+
+# Columns of the results_joined view beyond RESULT_COLUMNS: (source, name)
+JOINED_COLUMNS = [
+    ("s.created_date", "session_created_date"),
+    ("s.completed", "session_completed"),
+    ("s.completed_at", "session_completed_at"),
+    ("s.final_score", "session_final_score"),
+    ("s.health_band", "session_health_band"),
+    ("c.email", "contact_email"),
+    ("c.first_name", "contact_first_name"),
+    ("c.last_name", "contact_last_name"),
+    ("c.company_name", "contact_company_name"),
+]
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+def load_config(secrets_path):
+    config = {"BASEROW_BASE_URL": "https://baserowapp.goxmit.com/api"}
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "rb") as f:
+            config.update({k: v for k, v in tomllib.load(f).items() if k in CONFIG_KEYS})
+    config.update({k: os.environ[k] for k in CONFIG_KEYS if k in os.environ})
+    missing = [k for k in CONFIG_KEYS if not config.get(k)]
+    if missing:
+        raise SystemExit(f"Missing configuration: {', '.join(missing)}")
+    return config
+
+
+# -------------------------------
+# Baserow client
+# -------------------------------
+class BaserowReader:
+    """Read-only Baserow client with a pooled session sized for the export concurrency"""
+
+    def __init__(self, base_url, token, concurrency):
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Authorization"] = f"Token {token}"
+
+    def get(self, endpoint, params=None):
+        query_params = {"user_field_names": "true"}
+        if params:
+            query_params.update(params)
+        response = self.session.get(f"{self.base_url}/{endpoint}", params=query_params, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def count_rows(self, table_id):
+        return self.get(f"database/rows/table/{table_id}/", params={"size": "1"})["count"]
+
+    def list_response(self, table_id, page, page_size, filters=None):
+        params = {"page": str(page), "size": str(page_size)}
+        if filters:
+            params.update(filters)
+        return self.get(f"database/rows/table/{table_id}/", params=params)
+
+    def list_page(self, table_id, page, page_size, filters=None):
+        return self.list_response(table_id, page, page_size, filters)["results"]
+
+
+def iter_new_rows(reader, pool, table_id, cursor, page_size, concurrency):
+    """
+    Yield batches of rows with id > cursor, walking pages back from the end of the table.
+
+    The app only appends rows, so Baserow's default order is id order and new
+    rows sit at the tail; `concurrency` pages are fetched at a time and the walk
+    stops at the first page that reaches back to the cursor.
+    """
+    page = math.ceil(reader.count_rows(table_id) / page_size)
+    while page >= 1:
+        window = list(range(page, max(0, page - concurrency), -1))
+        pages = pool.map(lambda p: reader.list_page(table_id, p, page_size), window)
+        reached_cursor = False
+        for rows in pages:
+            new_rows = [row for row in rows if row["id"] > cursor]
+            if new_rows:
+                yield new_rows
+            if len(new_rows) < len(rows):
+                reached_cursor = True
+        if reached_cursor:
+            return
+        page -= concurrency
+
+
+def iter_filtered_rows(reader, pool, table_id, filters, page_size, concurrency):
+    """Yield every page of a filtered list request, `concurrency` pages in flight after the first"""
+    first = reader.list_response(table_id, 1, page_size, filters)
+    yield first["results"]
+    pages = list(range(2, math.ceil(first["count"] / page_size) + 1))
+    for start in range(0, len(pages), concurrency):
+        yield from pool.map(
+            lambda p: reader.list_page(table_id, p, page_size, filters),
+            pages[start:start + concurrency]
+        )
+
+
+# -------------------------------
+# Row flattening
+# -------------------------------
+def field_value(value):
+    """Plain value for SQLite: select options and link rows collapse to their text"""
+    if isinstance(value, dict):
+        return value.get("value")
+    if isinstance(value, list):
+        return ", ".join(str(field_value(item)) for item in value)
+    return value
+
+def link_id(value):
+    return value[0]["id"] if value else None
+
+def session_record(session):
+    return {column: field_value(session.get(column)) for column in SESSION_COLUMNS}
+
+def contact_record(contact):
+    return {column: field_value(contact.get(column)) for column in CONTACT_COLUMNS}
+
+def result_record(result):
+    record = {column: field_value(result.get(column)) for column in RESULT_BASE_COLUMNS}
+    record["session_id"] = link_id(result.get("assessment_sessions"))
+    record["contact_id"] = link_id(result.get("contact"))
+    return record
+
+
+# -------------------------------
+# SQLite dataset
+# -------------------------------
+def open_dataset(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS export_cursor (table_name TEXT PRIMARY KEY, last_id INTEGER)")
+    db.execute(f"CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY, {', '.join(RESULT_COLUMNS[1:])})")
+    db.execute(f"CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, {', '.join(SESSION_COLUMNS[1:])})")
+    db.execute(f"CREATE TABLE IF NOT EXISTS contacts (id INTEGER PRIMARY KEY, {', '.join(CONTACT_COLUMNS[1:])})")
+    # Explicit columns: results tables from older exports still carry frozen session_*/contact_* copies
+    columns = [f"r.{column}" for column in RESULT_COLUMNS] + [f"{source} AS {name}" for source, name in JOINED_COLUMNS]
+    db.execute("DROP VIEW IF EXISTS results_joined")
+    db.execute(
+        f"CREATE VIEW results_joined AS SELECT {', '.join(columns)} FROM results r"
+        " LEFT JOIN sessions s ON s.id = r.session_id"
+        " LEFT JOIN contacts c ON c.id = r.contact_id"
+    )
+    db.commit()
+    return db
+
+def read_cursor(db, table_name):
+    row = db.execute("SELECT last_id FROM export_cursor WHERE table_name = ?", (table_name,)).fetchone()
+    return row[0] if row else 0
+
+def write_rows(db, table_name, columns, records):
+    placeholders = ", ".join("?" for _ in columns)
+    db.executemany(
+        f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+        [[record[column] for column in columns] for record in records]
+    )
+
+def advance_cursor(db, table_name, last_id):
+    db.execute(
+        "INSERT OR REPLACE INTO export_cursor (table_name, last_id) VALUES (?, ?)",
+        (table_name, last_id)
+    )
+
+
+# -------------------------------
+# Export
+# -------------------------------
+def export_table(reader, pool, db, table_id, table_name, columns, to_record, page_size, concurrency):
+    """Append rows added since the last run to `table_name`; returns how many"""
+    cursor = read_cursor(db, table_name)
+    last_id, exported = cursor, 0
+    for rows in iter_new_rows(reader, pool, table_id, cursor, page_size, concurrency):
+        write_rows(db, table_name, columns, [to_record(row) for row in rows])
+        last_id = max(last_id, max(row["id"] for row in rows))
+        exported += len(rows)
+    # Cursor only moves once every page is in; a rerun after a failure re-upserts the same rows
+    advance_cursor(db, table_name, last_id)
+    db.commit()
+    return exported
+
+def export_sessions(reader, pool, db, config, page_size, concurrency):
+    return export_table(reader, pool, db, config["SESSIONS_TABLE_ID"], "sessions", SESSION_COLUMNS,
+                        session_record, page_size, concurrency)
+
+def export_contacts(reader, pool, db, config, page_size, concurrency):
+    return export_table(reader, pool, db, config["CONTACTS_TABLE_ID"], "contacts", CONTACT_COLUMNS,
+                        contact_record, page_size, concurrency)
+
+def export_results(reader, pool, db, config, page_size, concurrency):
+    """Sessions and contacts are joined locally by the results_joined view, not fetched per result"""
+    return export_table(reader, pool, db, config["RESULTS_TABLE_ID"], "results", RESULT_COLUMNS,
+                        result_record, page_size, concurrency)
+
+def refresh_open_sessions(reader, pool, db, config, page_size, concurrency, since):
+    """
+    Re-sync sessions exported while still open that have since been completed
+    or marked abandoned (by the app's sweeper). Lists only closed sessions
+    created on or after the oldest open local one, and no earlier than `since`.
+    """
+    open_rows = db.execute(
+        "SELECT id, created_date FROM sessions"
+        " WHERE coalesce(completed, 0) = 0 AND coalesce(abandoned, 0) = 0 AND created_date >= ?",
+        (since,)
+    ).fetchall()
+    if not open_rows:
+        return 0
+    open_ids = {row_id for row_id, _ in open_rows}
+    oldest = min(created_date for _, created_date in open_rows)
+
+    refreshed = 0
+    for flag in ("completed", "abandoned"):
+        filters = {
+            "filter_type": "AND",
+            f"filter__{flag}__boolean": "true",
+            "filter__created_date__date_after_or_equal": oldest,
+            "include": ",".join(SESSION_COLUMNS[1:]),
+        }
+        try:
+            for rows in iter_filtered_rows(reader, pool, config["SESSIONS_TABLE_ID"], filters, page_size, concurrency):
+                closed = [row for row in rows if row["id"] in open_ids]
+                write_rows(db, "sessions", SESSION_COLUMNS, [session_record(row) for row in closed])
+                open_ids -= {row["id"] for row in closed}
+                refreshed += len(closed)
+        except requests.exceptions.HTTPError as e:
+            # The abandoned column only exists once the sweeper has been set up
+            if e.response is None or e.response.status_code != 400:
+                raise
+            print(f"Skipping {flag} re-sync: {e.response.text}")
+    db.commit()
+    return refreshed
+
+def refresh_contacts(reader, pool, db, config, page_size, concurrency, since):
+    """Re-read contacts created on or after `since`; names and company are filled in after creation"""
+    filters = {"filter__created_date__date_after_or_equal": since, "include": ",".join(CONTACT_COLUMNS[1:])}
+    for rows in iter_filtered_rows(reader, pool, config["CONTACTS_TABLE_ID"], filters, page_size, concurrency):
+        write_rows(db, "contacts", CONTACT_COLUMNS, [contact_record(row) for row in rows])
+    db.commit()
+
+def refresh_report_status(reader, pool, db, config, page_size, concurrency, since):
+    """Re-read report_status of results created on or after `since`; it changes after export"""
+    filters = {"filter__created_date__date_after_or_equal": since, "include": "report_status"}
+    for rows in iter_filtered_rows(reader, pool, config["RESULTS_TABLE_ID"], filters, page_size, concurrency):
+        db.executemany(
+            "UPDATE results SET report_status = ? WHERE id = ?",
+            [(field_value(row.get("report_status")), row["id"]) for row in rows]
+        )
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join("exports", "inventory_health.sqlite"),
+                        help="SQLite file to append to (default: %(default)s)")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"),
+                        help="secrets file with the Baserow settings (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Baserow requests in flight (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, default=200,
+                        help="rows per list request, Baserow allows up to 200 (default: %(default)s)")
+    parser.add_argument("--resync-days", type=int, default=30,
+                        help="how far back open sessions, contacts and report status are re-synced (default: %(default)s)")
+    args = parser.parse_args()
+
+    config = load_config(args.secrets)
+    reader = BaserowReader(config["BASEROW_BASE_URL"], config["BASEROW_TOKEN"], args.concurrency)
+    db = open_dataset(args.db)
+    since = (date.today() - timedelta(days=args.resync_days)).strftime("%Y-%m-%d")
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            sessions = export_sessions(reader, pool, db, config, args.page_size, args.concurrency)
+            refreshed = refresh_open_sessions(reader, pool, db, config, args.page_size, args.concurrency, since)
+            contacts = export_contacts(reader, pool, db, config, args.page_size, args.concurrency)
+            refresh_contacts(reader, pool, db, config, args.page_size, args.concurrency, since)
+            results = export_results(reader, pool, db, config, args.page_size, args.concurrency)
+            refresh_report_status(reader, pool, db, config, args.page_size, args.concurrency, since)
+    finally:
+        db.close()
+    print(f"Exported {sessions} new sessions, {contacts} new contacts and {results} new results to {args.db}; "
+          f"{refreshed} open sessions closed")
+
+
+if __name__ == "__main__":
+    main()